@@ -2,10 +2,17 @@ import os
 import re
 import csv
 import sys
+import math
 import json
 import time
+import heapq
+import hashlib
+import random
 import logging
 import argparse
+import tempfile
+import functools
+import multiprocessing
 from datetime import date
 from xml.etree import ElementTree as ET
 from collections import deque, defaultdict
@@ -92,22 +99,6 @@ def write_csv(file, dialect, row_list, write_log=True):
     return
 
 
-def get_year_to_div_from_html(html, first_year, last_year):
-    last_year_header = f'<h4><span class="mw-headline" id="{last_year}">{last_year}</span></h4>'
-    for line_index, line in enumerate(html):
-        if line == last_year_header:
-            break
-    else:
-        raise AssertionError
-
-    year_to_div = {}
-    for year in range(first_year, last_year + 1):
-        li = line_index + (last_year - year) * 2 + 1
-        assert html[li - 1] == f'<h4><span class="mw-headline" id="{year}">{year}</span></h4>'
-        year_to_div[year] = html[li]
-    return year_to_div
-
-
 def get_date_from_html(html, year):
     comma = html.find(",")
     if comma != -1:
@@ -151,7 +142,7 @@ def get_full_link(link):
         assert False
 
 
-def get_date_to_tournament_from_div(div, year):
+def get_tournament_list_from_div(div, year):
     img_exp = r"<img[^>]+>"
     div = re.sub(img_exp, "", div)
 
@@ -161,7 +152,7 @@ def get_date_to_tournament_from_div(div, year):
     root = ET.fromstring(div)
     assert root[0][0].tag == "tbody"
     root = root[0][0]
-    date_to_tournament = defaultdict(lambda: [])
+    tournament_list = []
 
     for row in root[1:]:
         start_date = "".join(row[0].itertext())
@@ -183,51 +174,125 @@ def get_date_to_tournament_from_div(div, year):
         prize = prize[1:].replace(",", "")
         prize = int(float(prize))
 
-        date_to_tournament[(end_date, start_date)].append(
-            [start_date, end_date, tournament_name, prize, tournament_link]
-        )
-    return date_to_tournament
+        tournament_list.append([start_date, end_date, tournament_name, prize, tournament_link])
+    return tournament_list
 
 
-def parse_tournment_list_html(source_file, first_date, last_date, level):
-    html = read_lines(source_file)
+def get_sorted_tournament_list_from_html(html, first_date, last_date, level):
+    first_year, last_year = int(first_date[:4]), int(last_date[:4])
+    first_date, last_date = int(first_date), int(last_date)
+    year_header_exp = re.compile(r'<h4><span class="mw-headline" id="(\d{4})">\d{4}</span></h4>$')
+
+    # a single pass over the page; the div of a year is the line right after its header
+    year_to_tournament_list = {}
+    for li, line in enumerate(html):
+        if not line.startswith("<h4>"):
+            continue
+        match = year_header_exp.match(line)
+        if match is None:
+            continue
+        year = int(match.group(1))
+        if year < first_year or year > last_year:
+            continue
+        year_to_tournament_list[year] = [
+            [level] + tournament
+            for tournament in get_tournament_list_from_div(html[li + 1], year)
+            if first_date <= tournament[1] <= last_date
+        ]
+    assert set(year_to_tournament_list) == set(range(first_year, last_year + 1))
+
+    # pages list the latest year first; a stable sort over ascending years keeps ties in year then row order
+    tournament_list = []
+    for year in sorted(year_to_tournament_list):
+        tournament_list += year_to_tournament_list[year]
+    tournament_list.sort(key=lambda tournament: (tournament[2], tournament[1]))
+
+    tournaments = len(tournament_list)
+    logger.info(f"Read {tournaments:,} {level} tournaments")
+    return tournament_list
 
-    first_year, first_month, first_day = int(first_date[:4]), int(first_date[4:6]), int(first_date[6:8])
-    last_year, last_month, last_day = int(last_date[:4]), int(last_date[4:6]), int(last_date[6:8])
-    first_date = int(first_date)
-    last_date = int(last_date)
 
-    year_to_div = get_year_to_div_from_html(html, first_year, last_year)
+def get_tier_list(arg):
+    tier_list = [
+        ("premier", arg.premier_list_file),
+        ("major", arg.major_list_file),
+        ("minor", arg.minor_list_file),
+        ("qualifier", arg.qualifier_list_file),
+    ]
+    tier_list = [(level, file) for level, file in tier_list if file]
+    return tier_list
 
-    date_to_tournament = defaultdict(lambda: [])
-    for year, div in year_to_div.items():
-        yearly_date_to_tournament = get_date_to_tournament_from_div(div, year)
-        for date, tournament_list in yearly_date_to_tournament.items():
-            end_date = date[0]
-            if first_date <= end_date <= last_date:
-                for tournament in tournament_list:
-                    date_to_tournament[date].append([level] + tournament)
 
-    tournaments = sum(len(t_list) for t_list in date_to_tournament.values())
-    logger.info(f"Read {tournaments:,} {level} tournaments")
-    return date_to_tournament
+def get_merged_tournament_list(tier_list, first_date, last_date):
+    sorted_tournament_list_list = [
+        get_sorted_tournament_list_from_html(read_lines(file), first_date, last_date, level)
+        for level, file in tier_list
+    ]
+    # ties on (end, start) keep the tier order
+    tournament_list = heapq.merge(
+        *sorted_tournament_list_list, key=lambda tournament: (tournament[2], tournament[1])
+    )
+    return list(tournament_list)
 
 
 def run_liquipedia_tournament_list_parser(arg):
-    premier_date_to_tournament = parse_tournment_list_html(arg.premier_list_file, arg.first_date, arg.last_date, "premier")
-    major_date_to_tournament = parse_tournment_list_html(arg.major_list_file, arg.first_date, arg.last_date, "major")
-    date_to_tournament = premier_date_to_tournament
-    for date, tournament_list in major_date_to_tournament.items():
-        for tournament in tournament_list:
-            date_to_tournament[date].append(tournament)
+    tier_list = get_tier_list(arg)
     data = [["level", "start", "end", "name", "prize", "link"]]
-    for _, tournament_list in sorted(date_to_tournament.items()):
-        for tournament in tournament_list:
-            data.append(tournament)
+    data += get_merged_tournament_list(tier_list, arg.first_date, arg.last_date)
     write_csv(arg.tournament_list_file, "csv", data)
     return
 
 
+def get_synthetic_tournament_list_html(first_year, last_year, tournaments_per_year, level):
+    month_list = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    html = ["<html>", "<body>"]
+    for year in range(last_year, first_year - 1, -1):
+        html.append(f'<h4><span class="mw-headline" id="{year}">{year}</span></h4>')
+        row_list = ["<tr><th>Start</th><th>End</th><th>Tournament</th><th>Location</th><th>Prize</th></tr>"]
+        for ti in range(tournaments_per_year):
+            month = ti * 12 // tournaments_per_year
+            start = f"{month_list[month]} {ti % 28 + 1}"
+            end = f"{month_list[(month + 1) % 12]} {(ti * 7) % 28 + 1}"
+            if month == 11:
+                end += f", {year + 1}"
+            link = f"/starcraft2/{level}_{year}/Event_{ti}"
+            row_list.append(
+                f'<tr><td>{start}</td><td>{end}</td>'
+                f'<td><a href="{link}"><img src="/logo.png" alt=""></a>&nbsp;<a href="{link}">{level} {year} #{ti}</a></td>'
+                f'<td>Online</td><td>${(ti + 1) * 1000:,}</td></tr>'
+            )
+        html.append('<div class="divTable"><table class="wikitable"><tbody>' + "".join(row_list) + "</tbody></table></div>")
+    html += ["</body>", "</html>"]
+    return html
+
+
+def run_tournament_list_parser_benchmark(arg):
+    first_year, last_year = 2010, 2024
+    first_date, last_date = f"{first_year}0101", f"{last_year}1231"
+    level_list = ["premier", "major", "minor", "qualifier"]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        tier_list = []
+        for level in level_list:
+            file = os.path.join(temp_dir, f"{level}.html")
+            html = get_synthetic_tournament_list_html(first_year, last_year, arg.benchmark_tournaments, level)
+            with open(file, "w", encoding="utf8") as f:
+                f.write("\n".join(html))
+            tier_list.append((level, file))
+
+        for tiers in range(1, len(tier_list) + 1):
+            seconds_list = []
+            for _ in range(arg.benchmark_repeats):
+                start_time = time.perf_counter()
+                tournament_list = get_merged_tournament_list(tier_list[:tiers], first_date, last_date)
+                seconds_list.append(time.perf_counter() - start_time)
+
+            tournaments = len(tournament_list)
+            seconds = min(seconds_list)
+            logger.info(f"{tiers} tiers, {tournaments:,} tournaments: {seconds:.3f}s (best of {arg.benchmark_repeats})")
+    return
+
+
 def get_tournament_file_name(start, end, link):
     link_prefix = "https://liquipedia.net/starcraft2/"
     assert link.startswith(link_prefix)
@@ -237,6 +302,16 @@ def get_tournament_file_name(start, end, link):
     return file
 
 
+def crawl_tournament_page(link, file):
+    html = requests.get(link).text
+    if "Rate Limited" in html:
+        return False
+    with open(file, "w", encoding="utf8") as f:
+        f.write(html)
+    logger.info(f"Saved to {file}")
+    return True
+
+
 def run_liquipedia_tournament_page_crawler(arg):
     tournament_data = read_csv(arg.tournament_list_file, "csv")
     tournaments = len(tournament_data) - 1
@@ -249,14 +324,11 @@ def run_liquipedia_tournament_page_crawler(arg):
             line_list = read_lines(file, write_log=False)
             if "Rate Limited" not in line_list[0]:
                 continue
-        html = requests.get(link).text
+        is_saved = crawl_tournament_page(link, file)
         time.sleep(3)
-        if "Rate Limited" in html:
+        if not is_saved:
             logger.info("Rate Limited")
             break
-        with open(file, "w", encoding="utf8") as f:
-            f.write(html)
-        logger.info(f"Saved to {file}")
     return
 
 
@@ -617,12 +689,13 @@ class Player:
         return f"{self.name_list[0]}({self.race_list[0]})"
 
 
-def initialize_all_player(player_list):
+def initialize_all_player(player_list, engine):
     pid_to_player = {}
     for rame_list in player_list:
         race_list = [r for r in rame_list[1]]
         name_list = rame_list[2:]
         player = Player(race_list, name_list)
+        engine.initialize_player(player)
         pid_to_player[player.pid] = player
     return pid_to_player
 
@@ -635,13 +708,26 @@ def get_python_date(str_date):
     return python_date
 
 
-def get_elo_update(p1, p2, score1, score2):
-    q1 = 10 ** (p1.elo / 400)
-    q2 = 10 ** (p2.elo / 400)
+def get_expected_score_list(max_difference):
+    # expected score of the vanilla Elo system indexed by integer rating difference + max_difference
+    expected_score_list = [
+        1 / (1 + 10 ** (-difference / 400))
+        for difference in range(-max_difference, max_difference + 1)
+    ]
+    return expected_score_list
+
 
+def get_elo_update(p1, p2, score1, score2, expected_score_list=None):
     rounds = score1 + score2
-    expected1 = rounds * q1 / (q1 + q2)
-    # expected2 = rounds * q2 / (q1 + q2)
+    max_difference = len(expected_score_list) // 2 if expected_score_list else -1
+    difference = p1.elo - p2.elo
+    if -max_difference <= difference <= max_difference:
+        expected1 = rounds * expected_score_list[difference + max_difference]
+    else:
+        q1 = 10 ** (p1.elo / 400)
+        q2 = 10 ** (p2.elo / 400)
+        expected1 = rounds * q1 / (q1 + q2)
+        # expected2 = rounds * q2 / (q1 + q2)
 
     k1 = 40 if p1.matches < 50 else 20
     k2 = 40 if p2.matches < 50 else 20
@@ -655,13 +741,197 @@ def get_elo_update(p1, p2, score1, score2):
     return update1, update2
 
 
-def run_player_elo_calculation(arg):
-    player_list = read_csv(arg.player_name_file, "csv")
-    pid_to_player = initialize_all_player(player_list)
+class RatingEngine:
+    # player attributes saved in the live state
+    player_attribute_list = ["elo", "highest_elo", "tournaments", "matches"]
 
-    match_list = read_csv(arg.match_list_file, "csv")[1:]
+    def initialize_player(self, player):
+        return
+
+    def get_state(self):
+        return {}
+
+    def set_state(self, state):
+        return
+
+    def add_match(self, p1, p2, score1, score2):
+        raise NotImplementedError
+
+    def update_rating(self, participant_list, current_date):
+        raise NotImplementedError
+
+    def update_absence(self, absentee_list, current_date):
+        for player in absentee_list:
+            player.update_recent_elo_list(current_date)
+        return
+
+
+class EloEngine(RatingEngine):
+    def __init__(self):
+        self.expected_score_list = get_expected_score_list(1500)
+        return
+
+    def add_match(self, p1, p2, score1, score2):
+        update1, update2 = get_elo_update(p1, p2, score1, score2, self.expected_score_list)
+        p1.elo_cache += update1
+        p2.elo_cache += update2
+        return
+
+    def update_rating(self, participant_list, current_date):
+        for player in participant_list:
+            player.update_elo(current_date)
+        return
+
+
+class Glicko2Engine(RatingEngine):
+    player_attribute_list = RatingEngine.player_attribute_list + ["mu", "phi", "sigma", "g", "period"]
+
+    def __init__(self, rd=350, volatility=0.06, tau=0.5, epsilon=0.000001):
+        self.scale = 400 / math.log(10)
+        self.initial_phi = rd / self.scale
+        self.initial_sigma = volatility
+        self.tau = tau
+        self.epsilon = epsilon
+        self.period = 0
+        return
+
+    def get_state(self):
+        return {"period": self.period}
+
+    def set_state(self, state):
+        self.period = state["period"]
+        return
+
+    def initialize_player(self, player):
+        player.mu = (player.elo - 1500) / self.scale
+        player.phi = self.initial_phi
+        player.sigma = self.initial_sigma
+        player.g = get_glicko2_g(player.phi)
+        player.period = self.period
+        player.v_inverse = 0.0
+        player.delta_sum = 0.0
+        return
+
+    def update_absent_phi(self, player):
+        # deviation growth of the periods a player missed is applied when the player shows up again
+        periods = self.period - player.period
+        if periods:
+            phi = math.sqrt(player.phi * player.phi + periods * player.sigma * player.sigma)
+            player.phi = min(phi, self.initial_phi)
+            player.g = get_glicko2_g(player.phi)
+            player.period = self.period
+        return
+
+    def add_match(self, p1, p2, score1, score2):
+        # each map is a game against the opponent's pre-tournament rating
+        self.update_absent_phi(p1)
+        self.update_absent_phi(p2)
+        rounds = score1 + score2
+        expected1 = 1 / (1 + math.exp(-p2.g * (p1.mu - p2.mu)))
+        expected2 = 1 / (1 + math.exp(-p1.g * (p2.mu - p1.mu)))
+        p1.v_inverse += rounds * p2.g * p2.g * expected1 * (1 - expected1)
+        p2.v_inverse += rounds * p1.g * p1.g * expected2 * (1 - expected2)
+        p1.delta_sum += p2.g * (score1 - rounds * expected1)
+        p2.delta_sum += p1.g * (score2 - rounds * expected2)
+        return
+
+    def update_rating(self, participant_list, current_date):
+        self.period += 1
+
+        # players whose matches had no map played are rated as absent
+        unrated_list = [p for p in participant_list if p.v_inverse == 0]
+        if unrated_list:
+            for player in unrated_list:
+                player.update_elo(current_date)
+            participant_list = [p for p in participant_list if p.v_inverse > 0]
+
+        v_list = [1 / p.v_inverse for p in participant_list]
+        delta_list = [v * p.delta_sum for v, p in zip(v_list, participant_list)]
+        sigma_list = [
+            self.get_volatility(p.phi, p.sigma, v, delta)
+            for p, v, delta in zip(participant_list, v_list, delta_list)
+        ]
+        phi_list = [
+            1 / math.sqrt(1 / (p.phi * p.phi + sigma * sigma) + 1 / v)
+            for p, v, sigma in zip(participant_list, v_list, sigma_list)
+        ]
+
+        for player, phi, sigma in zip(participant_list, phi_list, sigma_list):
+            player.mu += phi * phi * player.delta_sum
+            player.phi = phi
+            player.sigma = sigma
+            player.g = get_glicko2_g(phi)
+            player.period = self.period
+            player.v_inverse = 0.0
+            player.delta_sum = 0.0
+            # keep an integer elo so the output tables stay the same
+            player.elo_cache = round(1500 + self.scale * player.mu) - player.elo
+            player.update_elo(current_date)
+        return
+
+    def get_volatility(self, phi, sigma, v, delta):
+        # Illinois algorithm from Glickman's "Example of the Glicko-2 system", step 5
+        a = math.log(sigma * sigma)
+        tau2 = self.tau * self.tau
+        phi2 = phi * phi
+        delta2 = delta * delta
+
+        def f(x):
+            ex = math.exp(x)
+            return ex * (delta2 - phi2 - v - ex) / (2 * (phi2 + v + ex) ** 2) - (x - a) / tau2
+
+        lo = a
+        if delta2 > phi2 + v:
+            hi = math.log(delta2 - phi2 - v)
+        else:
+            k = 1
+            while f(a - k * self.tau) < 0:
+                k += 1
+            hi = a - k * self.tau
+
+        f_lo = f(lo)
+        f_hi = f(hi)
+        while abs(hi - lo) > self.epsilon:
+            mid = lo + (lo - hi) * f_lo / (f_hi - f_lo)
+            f_mid = f(mid)
+            if f_mid * f_hi <= 0:
+                lo, f_lo = hi, f_hi
+            else:
+                f_lo /= 2
+            hi, f_hi = mid, f_mid
+        return math.exp(lo / 2)
+
+
+def get_glicko2_g(phi):
+    return 1 / math.sqrt(1 + 3 * phi * phi / (math.pi * math.pi))
+
+
+def get_rating_engine(rating_system):
+    rating_system_to_engine = {
+        "elo": EloEngine,
+        "glicko2": Glicko2Engine,
+    }
+    return rating_system_to_engine[rating_system]()
+
+
+def update_tournament_player(pid_to_player, engine, current_date):
+    participant_list = []
+    absentee_list = []
+    for pid, player in pid_to_player.items():
+        if player.in_tournament:
+            participant_list.append(player)
+            player.tournaments += 1
+            player.in_tournament = False
+        else:
+            absentee_list.append(player)
+    engine.update_rating(participant_list, current_date)
+    engine.update_absence(absentee_list, current_date)
+    return
+
+
+def replay_match_list(pid_to_player, engine, match_list, first_date, last_date):
     latest_date = None
-    date_range = (get_python_date(arg.first_date), get_python_date(arg.last_date))
+    date_range = (get_python_date(first_date), get_python_date(last_date))
 
     for _, start, end, _, _, p1_name, p1_race, p1_score, p2_score, p2_race, p2_name, _, _ in match_list:
         match_date = (get_python_date(start), get_python_date(end))
@@ -670,15 +940,9 @@ def run_player_elo_calculation(arg):
         if match_date[1] > date_range[1]:
             break
 
-        # update elo after a tournament
+        # update ratings after a tournament
         if latest_date is not None and latest_date != match_date:
-            for pid, player in pid_to_player.items():
-                if player.in_tournament:
-                    player.update_elo(latest_date[1])
-                    player.tournaments += 1
-                    player.in_tournament = False
-                else:
-                    player.update_recent_elo_list(latest_date[1])
+            update_tournament_player(pid_to_player, engine, latest_date[1])
         latest_date = match_date
 
         # use normalized name as unique pid
@@ -693,26 +957,19 @@ def run_player_elo_calculation(arg):
         p1.matches += 1
         p2.matches += 1
 
-        # add the elo updates of the match to cache
+        # add the rating updates of the match to cache
         p1_score = int(p1_score)
         p2_score = int(p2_score)
-        update1, update2 = get_elo_update(p1, p2, p1_score, p2_score)
-        p1.elo_cache += update1
-        p2.elo_cache += update2
+        engine.add_match(p1, p2, p1_score, p2_score)
 
-    # update elo for the last tournament
-    for pid, player in pid_to_player.items():
-        if player.in_tournament:
-            player.update_elo(latest_date[1])
-            player.tournaments += 1
-            player.in_tournament = False
-        else:
-            player.update_recent_elo_list(latest_date[1])
+    # update ratings for the last tournament
+    if latest_date is not None:
+        update_tournament_player(pid_to_player, engine, latest_date[1])
+    return latest_date
 
-    match_threshold = 20
-    elo_threshold = 1600
 
-    data = [["id", "elo", "recent", "tournaments", "matches", "career_high"]]
+def get_current_elo_player_list(pid_to_player, match_threshold, elo_threshold):
+    player_list = []
     for pid, p in sorted(pid_to_player.items(), key=lambda pp: pp[1].elo, reverse=True):
         if p.matches < match_threshold:
             continue
@@ -720,9 +977,27 @@ def run_player_elo_calculation(arg):
             break
         if len(p.recent_elo_list) == 1:
             continue
-        recent_elo_change, is_recently_updated = p.get_recent_elo_change()
+        _, is_recently_updated = p.get_recent_elo_change()
         if not is_recently_updated:
             continue
+        player_list.append(p)
+    return player_list
+
+
+def run_player_elo_calculation(arg):
+    engine = get_rating_engine(arg.rating_system)
+    player_list = read_csv(arg.player_name_file, "csv")
+    pid_to_player = initialize_all_player(player_list, engine)
+
+    match_list = read_csv(arg.match_list_file, "csv")[1:]
+    replay_match_list(pid_to_player, engine, match_list, arg.first_date, arg.last_date)
+
+    match_threshold = 20
+    elo_threshold = 1600
+
+    data = [["id", "elo", "recent", "tournaments", "matches", "career_high"]]
+    for p in get_current_elo_player_list(pid_to_player, match_threshold, elo_threshold):
+        recent_elo_change, is_recently_updated = p.get_recent_elo_change()
         recent_elo_change = f"{recent_elo_change:+d}" if recent_elo_change != 0 else "0"
         full_name = p.get_full_name()
         data.append([full_name, p.elo, recent_elo_change, p.tournaments, p.matches, p.highest_elo])
@@ -742,10 +1017,386 @@ def run_player_elo_calculation(arg):
     return
 
 
+def run_rating_engine_benchmark(arg):
+    player_list = read_csv(arg.player_name_file, "csv")
+    match_list = read_csv(arg.match_list_file, "csv")[1:]
+
+    rating_system_to_seconds = {}
+    for rating_system in ["elo", "glicko2"]:
+        seconds_list = []
+        for _ in range(arg.benchmark_repeats):
+            engine = get_rating_engine(rating_system)
+            pid_to_player = initialize_all_player(player_list, engine)
+            start_time = time.perf_counter()
+            replay_match_list(pid_to_player, engine, match_list, arg.first_date, arg.last_date)
+            seconds_list.append(time.perf_counter() - start_time)
+        seconds = min(seconds_list)
+        rating_system_to_seconds[rating_system] = seconds
+        logger.info(f"{rating_system}: {seconds:.3f}s per replay (best of {arg.benchmark_repeats})")
+
+    ratio = rating_system_to_seconds["glicko2"] / rating_system_to_seconds["elo"]
+    logger.info(f"glicko2 / elo: {ratio:.2f}x")
+    return
+
+
+def run_expected_score_benchmark(arg):
+    expected_score_list = get_expected_score_list(1500)
+    p1 = Player(["X"], ["p1"])
+    p2 = Player(["X"], ["p2"])
+
+    # the table must round every update like the formula, including out-of-table differences
+    pair_list = []
+    for elo1 in range(500, 2501, 50):
+        for elo2 in range(0, 3001):
+            pair_list.append((elo1, elo2))
+    checks = 0
+    for elo1, elo2 in pair_list:
+        p1.elo = elo1
+        p2.elo = elo2
+        p1.matches = 0 if (elo1 + elo2) % 2 else 50
+        for rounds in range(1, 6):
+            for score1 in range(rounds + 1):
+                score2 = rounds - score1
+                update = get_elo_update(p1, p2, score1, score2)
+                table_update = get_elo_update(p1, p2, score1, score2, expected_score_list)
+                assert update == table_update, (elo1, elo2, score1, score2)
+                checks += 1
+    logger.info(f"{checks:,} matches rounded the same with and without the table")
+
+    # per-match latency of get_elo_update on realistic ratings
+    sample_list = [(elo1, elo2) for elo1, elo2 in pair_list[::37] if 1000 <= elo2 <= 2500]
+    p1.matches = 50
+    for name, table in [("formula", None), ("table", expected_score_list)]:
+        seconds_list = []
+        for _ in range(arg.benchmark_repeats):
+            start_time = time.perf_counter()
+            for elo1, elo2 in sample_list:
+                p1.elo = elo1
+                p2.elo = elo2
+                get_elo_update(p1, p2, 3, 2, table)
+            seconds_list.append(time.perf_counter() - start_time)
+        nanoseconds = min(seconds_list) / len(sample_list) * 1000000000
+        logger.info(f"get_elo_update with {name}: {nanoseconds:.0f}ns per match (best of {arg.benchmark_repeats})")
+
+    # full replays through EloEngine, and through the bootstrap's array replay
+    player_list = read_csv(arg.player_name_file, "csv")
+    match_list = read_csv(arg.match_list_file, "csv")[1:]
+    name_to_elo_list = {}
+    for name, table in [("formula", None), ("table", expected_score_list)]:
+        seconds_list = []
+        for _ in range(arg.benchmark_repeats):
+            engine = EloEngine()
+            engine.expected_score_list = table
+            pid_to_player = initialize_all_player(player_list, engine)
+            start_time = time.perf_counter()
+            replay_match_list(pid_to_player, engine, match_list, arg.first_date, arg.last_date)
+            seconds_list.append(time.perf_counter() - start_time)
+        name_to_elo_list[name] = [p.elo for p in pid_to_player.values()]
+        seconds = min(seconds_list)
+        logger.info(f"replay_match_list with {name}: {seconds:.4f}s per replay (best of {arg.benchmark_repeats})")
+    assert name_to_elo_list["formula"] == name_to_elo_list["table"]
+
+    period_match_list = get_period_match_list(pid_to_player, match_list, arg.first_date, arg.last_date)
+    players = len(pid_to_player)
+    seconds_list = []
+    for _ in range(arg.benchmark_repeats):
+        start_time = time.perf_counter()
+        elo_list = get_bootstrap_replica_elo(period_match_list, players, expected_score_list, False, False, 0)
+        seconds_list.append(time.perf_counter() - start_time)
+    seconds = min(seconds_list)
+    logger.info(f"get_bootstrap_replica_elo with table: {seconds:.4f}s per replay (best of {arg.benchmark_repeats})")
+    assert elo_list == name_to_elo_list["formula"]
+    return
+
+
+def get_rating_state(pid_to_player, engine):
+    pid_to_state = {
+        pid: [getattr(player, attribute) for attribute in engine.player_attribute_list]
+        for pid, player in pid_to_player.items()
+    }
+    return {"engine": engine.get_state(), "player": pid_to_state}
+
+
+def set_rating_state(pid_to_player, engine, state):
+    engine.set_state(state["engine"])
+    for pid, value_list in state["player"].items():
+        player = pid_to_player[pid]
+        for attribute, value in zip(engine.player_attribute_list, value_list):
+            setattr(player, attribute, value)
+    return
+
+
+def add_new_player(pid_to_player, engine, match_list):
+    # players and races first seen in a live tournament are not in the player name file yet
+    for _, _, _, _, _, p1_name, p1_race, _, _, p2_race, p2_name, _, _ in match_list:
+        for name, race in [(p1_name, p1_race), (p2_name, p2_race)]:
+            pid = get_pid_from_name(name)
+            if pid not in pid_to_player:
+                player = Player([race], [name])
+                engine.initialize_player(player)
+                pid_to_player[pid] = player
+                logger.info(f"New player: {player.get_full_name()}")
+            elif race not in pid_to_player[pid].race_list:
+                pid_to_player[pid].race_list.append(race)
+    return
+
+
+def get_match_diff(old_match_list, new_match_list):
+    old_count = defaultdict(lambda: 0)
+    for match in old_match_list:
+        old_count[tuple(match)] += 1
+    new_count = defaultdict(lambda: 0)
+    for match in new_match_list:
+        new_count[tuple(match)] += 1
+
+    added_list = []
+    for match, count in new_count.items():
+        added_list += [list(match)] * max(0, count - old_count[match])
+    removed_list = []
+    for match, count in old_count.items():
+        removed_list += [list(match)] * max(0, count - new_count[match])
+    return added_list, removed_list
+
+
+def run_live_tournament_update(arg):
+    tournament_data = read_csv(arg.tournament_list_file, "csv")
+    link_to_position = {tournament[5]: position for position, tournament in enumerate(tournament_data[1:])}
+    assert arg.live_link in link_to_position
+    level, start, end, name, prize, link = tournament_data[1 + link_to_position[arg.live_link]]
+
+    # fetch the latest page
+    if arg.live_html_file:
+        html = read_lines(arg.live_html_file)
+    else:
+        file = get_tournament_file_name(start, end, link)
+        file = os.path.join(arg.tournament_html_dir, file + ".html")
+        is_saved = crawl_tournament_page(link, file)
+        assert is_saved
+        html = read_lines(file)
+    assert "Rate Limited" not in "".join(html)
+
+    new_match_list = []
+    for title, p1_name, p1_race, p1_score, p2_score, p2_race, p2_name in parse_tournament_html(html):
+        new_match_list.append([
+            level, start, end, name,
+            title, p1_name, p1_race, str(p1_score), str(p2_score), p2_race, p2_name,
+            prize, link,
+        ])
+
+    # diff against the stored rows of the tournament
+    match_list = read_csv(arg.match_list_file, "csv")
+    header, match_list = match_list[0], match_list[1:]
+    old_match_list = [match for match in match_list if match[12] == link]
+    added_list, removed_list = get_match_diff(old_match_list, new_match_list)
+    logger.info(f"{name}: {len(added_list):,} added matches, {len(removed_list):,} removed matches")
+
+    # the stored state is reused only for the same tournament, settings and history
+    tournament_date = (end, start)
+    history_list = [match for match in match_list if (match[2], match[1]) < tournament_date]
+    history_hash = hashlib.sha1("\n".join(",".join(match) for match in history_list).encode("utf8")).hexdigest()
+    state_key = [link, arg.rating_system, arg.first_date, end, history_hash]
+    state = read_json(arg.live_state_file) if os.path.exists(arg.live_state_file) else {}
+    if not added_list and not removed_list and state.get("key") == state_key:
+        return
+
+    # store the new rows where the old ones were, or after the tournaments listed before this one
+    old_index_list = [index for index, match in enumerate(match_list) if match[12] == link]
+    if old_index_list:
+        insert_index = old_index_list[0]
+    else:
+        position = link_to_position[link]
+        for insert_index, match in enumerate(match_list):
+            if link_to_position.get(match[12], position + 1) > position:
+                break
+        else:
+            insert_index = len(match_list)
+    match_list = [match for match in match_list if match[12] != link]
+    match_list = match_list[:insert_index] + new_match_list + match_list[insert_index:]
+    write_csv(arg.match_list_file, "csv", [header] + match_list)
+
+    # load the ratings just before the tournament, replaying the history only when no state is stored
+    engine = get_rating_engine(arg.rating_system)
+    player_list = read_csv(arg.player_name_file, "csv")
+    pid_to_player = initialize_all_player(player_list, engine)
+    if state.get("key") == state_key:
+        add_new_player(pid_to_player, engine, [match for match in match_list if match[12] != link])
+        set_rating_state(pid_to_player, engine, state)
+    else:
+        # live events usually end after --last_date, so the tournament's end is the upper bound
+        add_new_player(pid_to_player, engine, history_list)
+        replay_match_list(pid_to_player, engine, history_list, arg.first_date, end)
+        state = get_rating_state(pid_to_player, engine)
+        state["key"] = state_key
+        write_json(arg.live_state_file, state, indent=arg.indent)
+
+    # rate the whole rating period, i.e. every tournament sharing the dates of the live one
+    period_list = [match for match in match_list if (match[2], match[1]) == tournament_date]
+    add_new_player(pid_to_player, engine, period_list)
+    pid_to_elo = {pid: player.elo for pid, player in pid_to_player.items()}
+    replay_match_list(pid_to_player, engine, period_list, arg.first_date, end)
+
+    affected_pid_set = set()
+    for _, _, _, _, _, p1_name, _, _, _, _, p2_name, _, _ in added_list + removed_list:
+        affected_pid_set.add(get_pid_from_name(p1_name))
+        affected_pid_set.add(get_pid_from_name(p2_name))
+    affected_players = len(affected_pid_set)
+    logger.info(f"{affected_players:,} affected players")
+
+    participant_pid_set = set()
+    for _, _, _, _, _, p1_name, _, _, _, _, p2_name, _, _ in new_match_list:
+        participant_pid_set.add(get_pid_from_name(p1_name))
+        participant_pid_set.add(get_pid_from_name(p2_name))
+
+    data = [["id", "elo", "provisional", "change", "matches", "affected"]]
+    for pid in sorted(participant_pid_set, key=lambda pid: pid_to_player[pid].elo, reverse=True):
+        p = pid_to_player[pid]
+        elo_change = p.elo - pid_to_elo[pid]
+        elo_change = f"{elo_change:+d}" if elo_change != 0 else "0"
+        affected = "Y" if pid in affected_pid_set else "N"
+        data.append([p.get_full_name(), pid_to_elo[pid], p.elo, elo_change, p.matches, affected])
+    write_csv(arg.live_elo_file, "csv", data)
+    return
+
+
+def get_period_match_list(pid_to_player, match_list, first_date, last_date):
+    # rating periods of (player index, player index, score, score), indexed in pid_to_player order
+    pid_to_index = {pid: index for index, pid in enumerate(pid_to_player)}
+    date_range = (get_python_date(first_date), get_python_date(last_date))
+    latest_date = None
+    period_match_list = []
+
+    for _, start, end, _, _, p1_name, p1_race, p1_score, p2_score, p2_race, p2_name, _, _ in match_list:
+        match_date = (get_python_date(start), get_python_date(end))
+        if match_date[1] < date_range[0]:
+            continue
+        if match_date[1] > date_range[1]:
+            break
+        if latest_date != match_date:
+            period_match_list.append([])
+        latest_date = match_date
+
+        p1 = get_pid_from_name(p1_name)
+        p2 = get_pid_from_name(p2_name)
+        assert p1_race in pid_to_player[p1].race_list
+        assert p2_race in pid_to_player[p2].race_list
+        period_match_list[-1].append((pid_to_index[p1], pid_to_index[p2], int(p1_score), int(p2_score)))
+    return period_match_list
+
+
+def get_bootstrap_replica_elo(period_match_list, players, expected_score_list, is_resampled, is_shuffled, seed):
+    # the vanilla Elo system on plain lists, optionally over resampled periods in shuffled order
+    rng = random.Random(seed)
+    periods = len(period_match_list)
+    if is_resampled:
+        period_index_list = sorted(rng.randrange(periods) for _ in range(periods))
+    else:
+        period_index_list = range(periods)
+
+    max_difference = len(expected_score_list) // 2
+    elo_list = [1500] * players
+    elo_cache_list = [0] * players
+    matches_list = [0] * players
+
+    for period_index in period_index_list:
+        match_list = period_match_list[period_index]
+        if is_shuffled:
+            match_list = match_list[:]
+            rng.shuffle(match_list)
+
+        for p1, p2, score1, score2 in match_list:
+            matches_list[p1] += 1
+            matches_list[p2] += 1
+            # same arithmetic as get_elo_update with a table
+            rounds = score1 + score2
+            difference = elo_list[p1] - elo_list[p2]
+            if -max_difference <= difference <= max_difference:
+                expected1 = rounds * expected_score_list[difference + max_difference]
+            else:
+                q1 = 10 ** (elo_list[p1] / 400)
+                q2 = 10 ** (elo_list[p2] / 400)
+                expected1 = rounds * q1 / (q1 + q2)
+            k = 40 if matches_list[p1] < 50 and matches_list[p2] < 50 else 20
+            update1 = round(k * (score1 - expected1))
+            elo_cache_list[p1] += update1
+            elo_cache_list[p2] -= update1
+
+        for p1, p2, _, _ in match_list:
+            elo_list[p1] += elo_cache_list[p1]
+            elo_cache_list[p1] = 0
+            elo_list[p2] += elo_cache_list[p2]
+            elo_cache_list[p2] = 0
+    return elo_list
+
+
+def get_percentile(sorted_value_list, q):
+    return sorted_value_list[round(q * (len(sorted_value_list) - 1))]
+
+
+def run_player_elo_bootstrap(arg):
+    engine = EloEngine()
+    player_list = read_csv(arg.player_name_file, "csv")
+    pid_to_player = initialize_all_player(player_list, engine)
+    match_list = read_csv(arg.match_list_file, "csv")[1:]
+    period_match_list = get_period_match_list(pid_to_player, match_list, arg.first_date, arg.last_date)
+    players = len(pid_to_player)
+    periods = len(period_match_list)
+    matches = sum(len(period) for period in period_match_list)
+    logger.info(f"{periods:,} rating periods, {matches:,} matches")
+
+    # the published replay defines the point estimates and the ranked players
+    replay_match_list(pid_to_player, engine, match_list, arg.first_date, arg.last_date)
+    expected_score_list = get_expected_score_list(1500)
+    elo_list = get_bootstrap_replica_elo(period_match_list, players, expected_score_list, False, False, 0)
+    assert elo_list == [p.elo for p in pid_to_player.values()]
+
+    # replicas are independent; each process replays a share of them
+    start_time = time.perf_counter()
+    get_replica_elo = functools.partial(
+        get_bootstrap_replica_elo,
+        period_match_list, players, expected_score_list, bool(arg.bootstrap_resample), bool(arg.bootstrap_shuffle),
+    )
+    seed_list = [arg.bootstrap_seed + replica for replica in range(arg.bootstrap_replicas)]
+    chunksize = max(1, len(seed_list) // (arg.bootstrap_processes * 4))
+    with multiprocessing.Pool(arg.bootstrap_processes) as pool:
+        replica_elo_list = pool.map(get_replica_elo, seed_list, chunksize=chunksize)
+    seconds = time.perf_counter() - start_time
+    logger.info(f"{arg.bootstrap_replicas:,} replicas in {seconds:.1f}s with {arg.bootstrap_processes} processes")
+
+    # rank among the players listed in the current ratings table
+    pid_to_index = {pid: index for index, pid in enumerate(pid_to_player)}
+    match_threshold = 20
+    elo_threshold = 1600
+    listed_player_list = get_current_elo_player_list(pid_to_player, match_threshold, elo_threshold)
+    index_list = [pid_to_index[p.pid] for p in listed_player_list]
+    index_to_rank_list = {index: [] for index in index_list}
+    index_to_elo_list = {index: [] for index in index_list}
+    for replica_elo in replica_elo_list:
+        for rank, index in enumerate(sorted(index_list, key=lambda index: replica_elo[index], reverse=True)):
+            index_to_rank_list[index].append(rank + 1)
+            index_to_elo_list[index].append(replica_elo[index])
+
+    low = arg.bootstrap_alpha / 2
+    high = 1 - arg.bootstrap_alpha / 2
+    data = [["id", "elo", "elo_low", "elo_high", "rank", "rank_low", "rank_high", "matches"]]
+    for rank, (p, index) in enumerate(zip(listed_player_list, index_list)):
+        replica_elo = sorted(index_to_elo_list[index])
+        replica_rank = sorted(index_to_rank_list[index])
+        data.append([
+            p.get_full_name(),
+            p.elo, get_percentile(replica_elo, low), get_percentile(replica_elo, high),
+            rank + 1, get_percentile(replica_rank, low), get_percentile(replica_rank, high),
+            p.matches,
+        ])
+    write_csv(arg.player_elo_interval_file, "csv", data)
+    return
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--premier_list_file", type=str, default="..\\premier_2022_0701.html")
     parser.add_argument("--major_list_file", type=str, default="..\\major_2022_0701.html")
+    parser.add_argument("--minor_list_file", type=str, default="")
+    parser.add_argument("--qualifier_list_file", type=str, default="")
     parser.add_argument("--tournament_list_file", type=str, default="..\\tournament_list.csv")
     parser.add_argument("--tournament_html_dir", type=str, default="..\\tournament_html")
     parser.add_argument("--match_list_file", type=str, default="..\\match_list.csv")
@@ -756,15 +1407,36 @@ def main():
     parser.add_argument("--first_date", type=str, default="20160101")
     parser.add_argument("--last_date", type=str, default="20220630")
     parser.add_argument("--elo_level", type=str, default="major")
+    parser.add_argument("--rating_system", type=str, default="elo", choices=["elo", "glicko2"])
+    parser.add_argument("--benchmark_repeats", type=int, default=5)
+    parser.add_argument("--benchmark_tournaments", type=int, default=40)
+
+    parser.add_argument("--live_link", type=str, default="")
+    parser.add_argument("--live_html_file", type=str, default="")
+    parser.add_argument("--live_state_file", type=str, default="..\\live_state.json")
+    parser.add_argument("--live_elo_file", type=str, default="..\\live_elo.csv")
+
+    parser.add_argument("--player_elo_interval_file", type=str, default="..\\player_elo_interval.csv")
+    parser.add_argument("--bootstrap_replicas", type=int, default=1000)
+    parser.add_argument("--bootstrap_processes", type=int, default=os.cpu_count())
+    parser.add_argument("--bootstrap_resample", type=int, default=1)
+    parser.add_argument("--bootstrap_shuffle", type=int, default=1)
+    parser.add_argument("--bootstrap_alpha", type=float, default=0.05)
+    parser.add_argument("--bootstrap_seed", type=int, default=0)
 
     parser.add_argument("--indent", type=int, default=2)
 
     arg = parser.parse_args()
     # run_liquipedia_tournament_list_parser(arg)
+    # run_tournament_list_parser_benchmark(arg)
     # run_liquipedia_tournament_page_crawler(arg)
     # run_liquipedia_tournament_page_parser(arg)
     # run_player_name_extraction(arg)
     run_player_elo_calculation(arg)
+    # run_rating_engine_benchmark(arg)
+    # run_expected_score_benchmark(arg)
+    # run_live_tournament_update(arg)
+    # run_player_elo_bootstrap(arg)
     return
 
 